@@ -1,11 +1,28 @@
 # SPDX-License-Identifier: Apache-2.0
 
 import boto3
-import json
 import logging
 import os
+from botocore.config import Config
 from crhelper import CfnResource
 
+# orjson parses and serializes considerably faster than stdlib json, but fall back
+# gracefully if the wheel is unavailable for the current platform.
+try:
+  import orjson
+
+  def _json_loads(payload):
+    return orjson.loads(payload)
+
+  def _json_dumps(obj):
+    # Secrets Manager requires a str, and orjson produces bytes.
+    return orjson.dumps(obj).decode()
+except ImportError:
+  import json
+
+  _json_loads = json.loads
+  _json_dumps = json.dumps
+
 
 RESOURCE_TYPE = 'AWS::ElastiCache::ReplicationGroup'
 
@@ -14,10 +31,18 @@ RESOURCE_TYPE = 'AWS::ElastiCache::ReplicationGroup'
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Keep pooled TLS connections alive across warm invocations and back off adaptively on throttling.
+_boto_config = Config(
+  connect_timeout=2,
+  read_timeout=10,
+  max_pool_connections=10,
+  retries={ 'mode': 'adaptive', 'total_max_attempts': 5 },
+  tcp_keepalive=True)
+
 helper = CfnResource()
 try:
-  secrets_manager_client = boto3.client('secretsmanager', endpoint_url=os.environ['SECRETS_MANAGER_ENDPOINT'])
-  elasticache_client = boto3.client('elasticache')
+  secrets_manager_client = boto3.client('secretsmanager', endpoint_url=os.environ['SECRETS_MANAGER_ENDPOINT'], config=_boto_config)
+  elasticache_client = boto3.client('elasticache', config=_boto_config)
 except Exception as e:
   helper.init_failure(e)
 
@@ -77,7 +102,7 @@ def create_update(event, context):
 
   # Make sure the current secret exists
   current_dict = _get_secret_dict(secret_id, 'AWSCURRENT')
-  logger.info(f'create_update: Successfully retrieved secret for ARN {secret_id}.')
+  logger.info('create_update: Successfully retrieved secret for ARN %s.', secret_id)
 
   # Retrieve connection information
   # (We have to be sure that the only connection information stored here is that which cannot
@@ -85,20 +110,22 @@ def create_update(event, context):
   replication_groups_metadata = elasticache_client.describe_replication_groups(ReplicationGroupId=target_id)
   # Getting the first (only) element of this collection is safe because we asked for one in particular.
   replication_group_metadata = replication_groups_metadata['ReplicationGroups'][0]
-  end_points = [ node_group['PrimaryEndpoint'] for node_group in replication_group_metadata['NodeGroups'] ]
 
   # Update the secret dictionary with connection information (generated password already present)
   current_dict['_metadata'] = { 'id': target_id }
-  current_dict[''] = [ f"{end_point['Address']}:{end_point['Port']}" for end_point in end_points ]
+  current_dict[''] = [
+    f"{end_point['Address']}:{end_point['Port']}"
+    for node_group in replication_group_metadata['NodeGroups']
+    for end_point in (node_group['PrimaryEndpoint'],) ]
   # Transit encryption *must* be enabled to be using auth token, but why not.
   current_dict['ssl'] = replication_group_metadata['TransitEncryptionEnabled']
 
   # Put the updated secret back
   secrets_manager_client.put_secret_value(
     SecretId=secret_id,
-    SecretString=json.dumps(current_dict),
+    SecretString=_json_dumps(current_dict),
     VersionStages=['AWSCURRENT'])
-  logger.info(f'create_update: Successfully put secret for ARN {secret_id}.')
+  logger.info('create_update: Successfully put secret for ARN %s.', secret_id)
 
 
 def _get_secret_dict(arn, stage, token=None):
@@ -125,7 +152,7 @@ def _get_secret_dict(arn, stage, token=None):
     secret = secrets_manager_client.get_secret_value(SecretId=arn, VersionId=token, VersionStage=stage)
   else:
     secret = secrets_manager_client.get_secret_value(SecretId=arn, VersionStage=stage)
-  return json.loads(secret['SecretString'])
+  return _json_loads(secret['SecretString'])
 
 
 def handle(event, context):
@@ -2,23 +2,60 @@
 
 import boto3
 import inspect
-import json
 import logging
 import os
+import secrets
+import string
 import time
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from redis import Redis, RedisError
 
+# orjson parses and serializes considerably faster than stdlib json, but fall back
+# gracefully if the wheel is unavailable for the current platform.
+try:
+  import orjson
+
+  def _json_loads(payload):
+    return orjson.loads(payload)
+
+  def _json_dumps(obj):
+    # Secrets Manager requires a str, and orjson produces bytes.
+    return orjson.dumps(obj).decode()
+except ImportError:
+  import json
+
+  _json_loads = json.loads
+  _json_dumps = json.dumps
+
 
 # Auth tokens:
 # >Must be only printable ASCII characters.
 # >The only permitted printable special characters are !, &, #, $, ^, <, >, and -.
 EXCLUDE_CHARACTERS = r'''"%'()*+,./:;=?@[\]_`{|}~'''
+# Printable ASCII (sans whitespace) minus the excluded characters, precomputed once.
+_AUTH_TOKEN_ALPHABET = ''.join(c for c in string.printable[:94] if c not in EXCLUDE_CHARACTERS)
+AUTH_TOKEN_LENGTH = 64
+
+# The signature of Redis.__init__ never changes at runtime, so reflect over it once.
+_REDIS_INIT_PARAMS = frozenset(inspect.signature(Redis.__init__).parameters.keys())
+
+# The keys a secret must carry to be usable for rotation.
+_REQUIRED_FIELDS = frozenset(('_metadata', '', 'ssl', 'password'))
 
 
 # Set up the dependencies
 logger = logging.getLogger()
-secrets_manager_client = boto3.client('secretsmanager', endpoint_url=os.environ['SECRETS_MANAGER_ENDPOINT'])
-elasticache_client = boto3.client('elasticache')
+
+# Keep pooled TLS connections alive across warm invocations and back off adaptively on throttling.
+_boto_config = Config(
+  connect_timeout=2,
+  read_timeout=10,
+  max_pool_connections=10,
+  retries={ 'mode': 'adaptive', 'total_max_attempts': 5 },
+  tcp_keepalive=True)
+secrets_manager_client = boto3.client('secretsmanager', endpoint_url=os.environ['SECRETS_MANAGER_ENDPOINT'], config=_boto_config)
+elasticache_client = boto3.client('elasticache', config=_boto_config)
 
 def handle(event, context):
   """Secrets Manager ElastiCache Replication Group Auth Token Rotator
@@ -66,7 +103,7 @@ def handle(event, context):
   if token not in versions:
     raise ValueError(f'Secret version {token} has no stage for rotation of secret {arn}.')
   if 'AWSCURRENT' in versions[token]:
-    logger.info(f'Secret version {token} is already set as AWSCURRENT for secret {arn}.')
+    logger.info('Secret version %s is already set as AWSCURRENT for secret %s.', token, arn)
     return
   elif 'AWSPENDING' not in versions[token]:
     raise ValueError(f'Secret version {token} is not set as AWSPENDING for rotation of secret {arn}.')
@@ -79,7 +116,7 @@ def handle(event, context):
   elif step == 'testSecret':
     test_secret(arn, token)
   elif step == 'finishSecret':
-    finish_secret(arn, token)
+    finish_secret(arn, token, secret_metadata)
   else:
     raise ValueError(f'handle: Invalid step parameter {step} for secret {arn}.')
 
@@ -107,19 +144,19 @@ def create_secret(arn, token):
   # Now try to get the secret version. If that fails, put a new secret
   try:
     _get_secret_dict(arn, 'AWSPENDING', token)
-    logger.info(f'create_secret: Successfully retrieved secret for {arn}.')
+    logger.info('create_secret: Successfully retrieved secret for %s.', arn)
   except secrets_manager_client.exceptions.ResourceNotFoundException:
-    # Generate a random auth token according to length recommendations and allowed character set
-    auth_token = secrets_manager_client.get_random_password(PasswordLength=64, ExcludeCharacters=EXCLUDE_CHARACTERS)
-    current_dict['password'] = auth_token['RandomPassword']
+    # Generate a random auth token according to length recommendations and allowed character set,
+    # locally — the stdlib CSPRNG spares a round-trip to get_random_password
+    current_dict['password'] = ''.join(secrets.choice(_AUTH_TOKEN_ALPHABET) for _ in range(AUTH_TOKEN_LENGTH))
 
     # Put the secret
     secrets_manager_client.put_secret_value(
       SecretId=arn,
       ClientRequestToken=token,
-      SecretString=json.dumps(current_dict),
+      SecretString=_json_dumps(current_dict),
       VersionStages=['AWSPENDING'])
-    logger.info(f'create_secret: Successfully put secret for ARN {arn} and version {token}.')
+    logger.info('create_secret: Successfully put secret for ARN %s and version %s.', arn, token)
 
 
 def set_secret(arn, token):
@@ -142,19 +179,26 @@ def set_secret(arn, token):
     KeyError: If the secret JSON does not contain the expected keys
 
   """
+  # Fetch all three candidate stages in one concurrent round-trip rather than serially.
+  # (The batch API keys on SecretId rather than VersionStage, so it's no help here.)
+  with ThreadPoolExecutor(max_workers=3) as executor:
+    pending_future = executor.submit(_get_secret_dict, arn, 'AWSPENDING', token)
+    current_future = executor.submit(_get_secret_dict, arn, 'AWSCURRENT')
+    previous_future = executor.submit(_get_secret_dict, arn, 'AWSPREVIOUS')
+
   # First try to log in with the pending secret. If it succeeds, return
-  pending_dict = _get_secret_dict(arn, 'AWSPENDING', token)
+  pending_dict = pending_future.result()
   pong = _ping_redis(pending_dict)
   if pong:
-    logger.info(f'set_secret: AWSPENDING secret is already set as auth token for secret {arn}.')
+    logger.info('set_secret: AWSPENDING secret is already set as auth token for secret %s.', arn)
     return
 
   # Now try the current secret
-  pong = _ping_redis(_get_secret_dict(arn, 'AWSCURRENT'))
+  pong = _ping_redis(current_future.result())
   if not pong:
     # If both current and pending do not work, try previous
     try:
-      pong = _ping_redis(_get_secret_dict(arn, 'AWSPREVIOUS'))
+      pong = _ping_redis(previous_future.result())
     except secrets_manager_client.exceptions.ResourceNotFoundException:
       pong = False
 
@@ -170,8 +214,11 @@ def set_secret(arn, token):
     AuthTokenUpdateStrategy='ROTATE',
     ApplyImmediately=True)
   # note(cosborn) Despite 'ApplyImmediately', it does take a hot moment to apply the new auth token.
+  # Back off exponentially (capped) rather than hammering the API at a fixed interval.
+  delay = 2
   while 'AuthTokenStatus' in replication_group_metadata['ReplicationGroup']['PendingModifiedValues']:
-    time.sleep(5)
+    time.sleep(delay)
+    delay = min(delay * 2, 30)
     replication_groups_metadata = elasticache_client.describe_replication_groups(ReplicationGroupId=replication_group_id)
     replication_group_metadata['ReplicationGroup'] = replication_groups_metadata['ReplicationGroups'][0]
 
@@ -199,7 +246,7 @@ def test_secret(arn, token):
     raise ValueError(f'test_secret: Unable to ping redis with pending secret of secret ARN {arn}.')
 
 
-def finish_secret(arn, token):
+def finish_secret(arn, token, metadata=None):
   """Finish the rotation by marking the pending secret as current
 
   This method finishes the secret rotation by staging the secret staged AWSPENDING with the AWSCURRENT stage.
@@ -209,18 +256,19 @@ def finish_secret(arn, token):
 
       token (string): The ClientRequestToken associated with the secret version
 
+      metadata (dict): The secret metadata from describe_secret, or None to fetch it fresh
+
   """
-  # First describe the secret to get the current version
-  metadata = secrets_manager_client.describe_secret(SecretId=arn)
-  current_version = None
-  for version in metadata['VersionIdsToStages']:
-    if 'AWSCURRENT' in metadata['VersionIdsToStages'][version]:
-      if version == token:
-        # The correct version is already marked as current, return
-        logger.info(f'finishSecret: Version {version} already marked as AWSCURRENT for {arn}.')
-        return
-      current_version = version
-      break
+  # Reuse the metadata already fetched by the handler rather than describing the secret again
+  if metadata is None:
+    metadata = secrets_manager_client.describe_secret(SecretId=arn)
+  current_version = next(
+    (version for version, stages in metadata['VersionIdsToStages'].items() if 'AWSCURRENT' in stages),
+    None)
+  if current_version == token:
+    # The correct version is already marked as current, return
+    logger.info('finishSecret: Version %s already marked as AWSCURRENT for %s.', token, arn)
+    return
 
   # Finalize by staging the secret version current
   secrets_manager_client.update_secret_version_stage(
@@ -228,7 +276,7 @@ def finish_secret(arn, token):
     VersionStage='AWSCURRENT',
     MoveToVersionId=token,
     RemoveFromVersionId=current_version)
-  logger.info(f'finish_secret: Successfully set AWSCURRENT stage to version {token} for secret {arn}.')
+  logger.info('finish_secret: Successfully set AWSCURRENT stage to version %s for secret %s.', token, arn)
 
 
 def _ping_redis(secret_dict):
@@ -248,16 +296,29 @@ def _ping_redis(secret_dict):
 
   """
   def ping(conn, conn_args):
-    host, port = conn.split(':', maxsplit=2)
+    # rpartition scans from the right, so IPv6 literals like [::1]:6379 parse correctly.
+    host, _, port = conn.rpartition(':')
     try:
       with Redis(host=host, port=port, **conn_args) as redis_client:
         return redis_client.ping()
     except RedisError as _:
       return False
 
-  signature_keys = inspect.signature(Redis.__init__).parameters.keys()
-  conn_args = { key: secret_dict[key] for key in secret_dict if key in signature_keys }
-  return all([ping(conn, conn_args) for conn in secret_dict['']])
+  conn_args = { key: value for key, value in secret_dict.items() if key in _REDIS_INIT_PARAMS }
+  # Bound the connection attempt so one slow endpoint can't stall the whole pool.
+  conn_args.setdefault('socket_connect_timeout', 2)
+
+  # Each ping is pure I/O, so ping every node group concurrently rather than serially,
+  # and give up on the first failure rather than waiting out every remaining endpoint.
+  endpoints = secret_dict['']
+  with ThreadPoolExecutor(max_workers=len(endpoints)) as executor:
+    futures = [ executor.submit(ping, conn, conn_args) for conn in endpoints ]
+    for future in as_completed(futures):
+      if not future.result():
+        for pending in futures:
+          pending.cancel()
+        return False
+  return True
 
 
 def _get_secret_dict(arn, stage, token=None):
@@ -281,18 +342,16 @@ def _get_secret_dict(arn, stage, token=None):
     KeyError: If a required field is not found in the secret JSON
 
   """
-  required_fields = ['_metadata', '', 'ssl', 'password']
-
   # Only do VersionId validation against the stage if a token is passed in
   if token:
     secret = secrets_manager_client.get_secret_value(SecretId=arn, VersionId=token, VersionStage=stage)
   else:
     secret = secrets_manager_client.get_secret_value(SecretId=arn, VersionStage=stage)
-  secret_dict = json.loads(secret['SecretString'])
+  secret_dict = _json_loads(secret['SecretString'])
 
   # Run validations against the secret
-  for field in required_fields:
-    if field not in secret_dict:
-      raise KeyError(f'{field} key is missing from secret JSON')
+  missing_fields = _REQUIRED_FIELDS.difference(secret_dict)
+  if missing_fields:
+    raise KeyError(f'{next(iter(missing_fields))} key is missing from secret JSON')
 
   return secret_dict